@@ -1,40 +1,86 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+import json
 import logging
-from typing import Dict, List, Any
+import os
+import time
+import re
+from typing import Dict, Any, Iterable, Iterator, Mapping, Optional, Tuple
+from types import MappingProxyType
+import functools
 from io import BytesIO
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xlsxwriter
+    MOTOR_EXCEL = 'xlsxwriter'
+except ImportError:
+    MOTOR_EXCEL = 'openpyxl'
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('BlockchainInfoAPI')
 
+# Vigencia (s) de los datos de la API en ambas capas de caché: st.cache_data (memoria) y disco
+DURACION_CACHE = 3600
+
 class BlockchainInfoAPI:
     BASE_URL = "https://api.blockchain.info"
+    MAX_BYTES = 25 * 1024 * 1024
 
-    def __init__(self, duracion_cache: int = 3600):
-        self.headers = {
-            'accept': '*/*',
-            'accept-language': 'es-ES,es;q=0.9,en;q=0.8',
-            'origin': 'https://www.blockchain.com',
-            'referer': 'https://www.blockchain.com/',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        }
+    # Constantes de solo lectura compartidas por todas las instancias
+    HEADERS = MappingProxyType({
+        'accept': 'application/json',
+        # gzip/deflate más br (y zstd) solo si urllib3 puede descomprimirlos
+        'accept-encoding': ACCEPT_ENCODING,
+        'accept-language': 'es-ES,es;q=0.9,en;q=0.8',
+        'origin': 'https://www.blockchain.com',
+        'referer': 'https://www.blockchain.com/',
+        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    })
 
-        self.parametros_predeterminados = {
-            'timespan': '1year',
-            'sampled': 'true',
-            'metadata': 'false',
-            'daysAverageString': '1d',
-            'cors': 'true',
-            'format': 'json',
-        }
+    PARAMETROS_PREDETERMINADOS = MappingProxyType({
+        'timespan': '1year',
+        'sampled': 'true',
+        'metadata': 'false',
+        'daysAverageString': '1d',
+        'cors': 'true',
+        'format': 'json',
+    })
 
-        self.cache = {}
+    def __init__(self, duracion_cache: int = DURACION_CACHE):
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        adaptador = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adaptador)
+
+        # Caché en disco (L2) bajo la de st.cache_data: sobrevive a reinicios de Streamlit.
+        # duracion_cache solo rige esta capa; el ttl en memoria es DURACION_CACHE
         self.duracion_cache = duracion_cache
+        # Junto al script, no relativo al directorio de arranque; sin diskcache solo queda la capa en memoria
+        ruta_cache = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'blockchain_api')
+        self._disco = diskcache.Cache(ruta_cache, size_limit=256 * 1024 * 1024) if diskcache is not None else None
 
         self.nombres_descriptivos = {
             'market-price': 'Precio de Mercado (USD)',
@@ -73,41 +119,117 @@ class BlockchainInfoAPI:
             'total-bitcoins': 'Bitcoins en Circulación',
         }
 
-    def _hacer_solicitud(self, endpoint: str, params: Dict[str, Any] = None, usar_cache: bool = True) -> Dict[str, Any]:
+        self.ids_por_descripcion = {desc: metrica for metrica, desc in self.nombres_descriptivos.items()}
+
+    def close(self):
+        self.session.close()
+        if self._disco is not None:
+            self._disco.close()
+
+    def _parametros_solicitud(self, endpoint: str, params: Dict[str, Any] = None) -> tuple:
         if params is None:
             params = {}
 
-        if 'charts' in endpoint:
-            new_params = self.parametros_predeterminados.copy()
-            new_params.update(params)
-            params = new_params
+        # Valores por defecto solo para la familia charts/, no para cualquier ruta que contenga 'charts'
+        if endpoint.startswith('charts/'):
+            params = {**self.PARAMETROS_PREDETERMINADOS, **params}
 
-        clave_cache = f"{endpoint}_{str(params)}"
-        ahora = time.time()
-
-        if usar_cache and clave_cache in self.cache:
-            datos_cache, timestamp = self.cache[clave_cache]
-            if ahora - timestamp < self.duracion_cache:
-                return datos_cache
+        # Tupla ordenada: hashable y estable para usar como clave de caché
+        return tuple(sorted(params.items()))
 
+    def _descargar(self, endpoint: str, params: tuple, cabeceras: Dict[str, str] = None) -> Tuple[Optional[Dict[str, Any]], Mapping[str, str]]:
         url = f"{self.BASE_URL}/{endpoint}"
         
         try:
-            respuesta = requests.get(url, params=params, headers=self.headers)
-            respuesta.raise_for_status()
-            datos = respuesta.json()
+            with self.session.get(url, params=dict(params), headers=cabeceras, timeout=(3.05, 30), stream=True) as respuesta:
+                respuesta.raise_for_status()
+                logger.debug(f"{url}: Content-Encoding={respuesta.headers.get('Content-Encoding')}")
 
-            if usar_cache:
-                self.cache[clave_cache] = (datos, ahora)
+                # 304: el contenido que ya tenemos sigue vigente
+                if respuesta.status_code == 304:
+                    return None, respuesta.headers
 
-            return datos
+                # Cortar antes de cargar en memoria respuestas desproporcionadas
+                if int(respuesta.headers.get('Content-Length', 0)) > self.MAX_BYTES:
+                    raise requests.exceptions.RequestException(f"Respuesta mayor de {self.MAX_BYTES} bytes")
+                contenido = respuesta.raw.read(self.MAX_BYTES + 1, decode_content=True)
+                if len(contenido) > self.MAX_BYTES:
+                    raise requests.exceptions.RequestException(f"Respuesta mayor de {self.MAX_BYTES} bytes")
+
+            # Cuerpo malformado o truncado: se trata como fallo de red (log + stale-if-error)
+            try:
+                datos = orjson.loads(contenido) if orjson is not None else json.loads(contenido)
+            except ValueError as e:
+                raise requests.exceptions.RequestException(f"JSON inválido: {str(e)}") from e
+            return datos, respuesta.headers
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error en {url}: {str(e)}")
             raise
 
+    def _obtener_datos(self, endpoint: str, params: tuple) -> Dict[str, Any]:
+        clave = (endpoint, params)
+        ahora = time.time()
+        entrada = self._disco.get(clave) if self._disco is not None else None
+        cabeceras = {}
+
+        if entrada is not None:
+            datos, timestamp, etag, last_modified = entrada
+            if ahora - timestamp < self.duracion_cache:
+                return datos
+            if etag:
+                cabeceras['If-None-Match'] = etag
+            if last_modified:
+                cabeceras['If-Modified-Since'] = last_modified
+
+        try:
+            nuevos, cabeceras_respuesta = self._descargar(endpoint, params, cabeceras)
+        except requests.exceptions.RequestException:
+            # Stale-if-error: ante un fallo de red se sirve la última copia buena del disco
+            if entrada is None:
+                raise
+            logger.warning(f"Sirviendo {endpoint} desde la caché en disco tras un error")
+            return datos
+
+        if nuevos is None:
+            nuevos = datos
+        else:
+            etag = cabeceras_respuesta.get('ETag')
+            last_modified = cabeceras_respuesta.get('Last-Modified')
+
+        # Con validadores la entrada se conserva más tiempo para revalidarla con un GET condicional
+        expira = self.duracion_cache * 24 if etag or last_modified else self.duracion_cache
+        if self._disco is not None:
+            self._disco.set(clave, (nuevos, ahora, etag, last_modified), expire=expira)
+
+        return nuevos
+
+    def _hacer_solicitud(self, endpoint: str, params: Dict[str, Any] = None, usar_cache: bool = True) -> Dict[str, Any]:
+        params = self._parametros_solicitud(endpoint, params)
+
+        if usar_cache:
+            return _solicitud_cacheada(self, endpoint, params)
+
+        datos, _ = self._descargar(endpoint, params)
+        return datos
+
     def _procesar_datos_grafico(self, datos: Dict[str, Any]) -> pd.DataFrame:
-        df = pd.DataFrame(datos['values'])
+        valores = datos['values']
+
+        # Caso habitual {x, y} numérico: dos arrays tipados sin inferencia de columnas
+        primero = valores[0]
+        if primero.keys() == {'x', 'y'} and isinstance(primero['y'], (int, float)):
+            try:
+                x = np.fromiter((v['x'] for v in valores), dtype=np.int64, count=len(valores))
+                y = np.fromiter((v['y'] for v in valores), dtype=np.float64, count=len(valores))
+            except (KeyError, TypeError, ValueError):
+                pass
+            else:
+                # Epoch en segundos reinterpretado como datetime64[s]: sin pasar por to_datetime
+                indice = pd.DatetimeIndex(x.astype('datetime64[s]'), name='x')
+                return pd.DataFrame({'y': y}, index=indice)
+
+        df = pd.DataFrame(valores)
 
         if 'x' in df.columns:
             df = df.set_index('x')
@@ -120,6 +242,14 @@ class BlockchainInfoAPI:
 
         return df
 
+    @staticmethod
+    def valores_serie(df: pd.DataFrame) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        if df is None or df.empty:
+            return None, None
+
+        col = 'y' if 'y' in df.columns else df.columns[0]
+        return df[col].to_numpy(), col
+
     def obtener_grafico(self, nombre_grafico: str, **params) -> pd.DataFrame:
         try:
             if nombre_grafico == 'mempool-state-by-fee-level':
@@ -128,17 +258,20 @@ class BlockchainInfoAPI:
             else:
                 endpoint = f"charts/{nombre_grafico}"
             
-            datos = self._hacer_solicitud(endpoint, params)
-            
-            if not datos or 'values' not in datos or not datos['values']:
-                return pd.DataFrame()
-            
-            return self._procesar_datos_grafico(datos)
+            return _grafico_cacheado(self, endpoint, self._parametros_solicitud(endpoint, params))
             
         except Exception as e:
             logger.error(f"Error al obtener {nombre_grafico}: {str(e)}")
             return pd.DataFrame()
 
+    def obtener_graficos_lote(self, nombres: Iterable[str], **params) -> Iterator[Tuple[str, pd.DataFrame]]:
+        # Descargas concurrentes sobre la sesión compartida; se entregan según terminan
+        nombres = list(nombres)
+        with ThreadPoolExecutor(max_workers=min(8, len(nombres))) as executor:
+            futuros = {executor.submit(self.obtener_grafico, nombre, **params): nombre for nombre in nombres}
+            for futuro in as_completed(futuros):
+                yield futuros[futuro], futuro.result()
+
     def obtener_pools(self, **params) -> pd.DataFrame:
         try:
             if 'timespan' not in params:
@@ -148,44 +281,57 @@ class BlockchainInfoAPI:
             endpoint = "pools"
             datos = self._hacer_solicitud(endpoint, params)
 
-            df = pd.DataFrame(columns=['relativeSize'])
+            filas = {}
 
             if isinstance(datos, dict):
                 for pool, info in datos.items():
                     if isinstance(info, dict) and 'relativeSize' in info:
-                        df.at[pool, 'relativeSize'] = info['relativeSize']
+                        filas[pool] = info['relativeSize']
                     elif isinstance(info, (int, float)):
-                        df.at[pool, 'relativeSize'] = info
+                        filas[pool] = info
 
-            return df.sort_values('relativeSize', ascending=False) if not df.empty else df
+            nombres = np.array(list(filas.keys()), dtype=object)
+            tamanos = np.fromiter(filas.values(), dtype=np.float64, count=len(filas))
+            orden = np.argsort(-tamanos, kind='stable')
+
+            return pd.DataFrame({'relativeSize': tamanos[orden]}, index=nombres[orden])
 
         except Exception as e:
             logger.error(f"Error al obtener pools: {str(e)}")
             return pd.DataFrame(columns=['relativeSize'])
 
-    def obtener_categorias_graficos(self) -> Dict[str, List[str]]:
-        return {
-            'Mercado': ['market-price', 'market-cap', 'trade-volume'],
-            'Detalles de Bloques': [
+    @functools.lru_cache(maxsize=1)
+    def obtener_categorias_graficos(self) -> Mapping[str, Tuple[str, ...]]:
+        return MappingProxyType({
+            'Mercado': ('market-price', 'market-cap', 'trade-volume'),
+            'Detalles de Bloques': (
                 'blocks-size', 'avg-block-size', 'n-transactions-per-block',
                 'n-payments-per-block', 'n-transactions-total',
                 'median-confirmation-time', 'avg-confirmation-time'
-            ],
-            'Información de Minería': [
+            ),
+            'Información de Minería': (
                 'hash-rate', 'difficulty', 'miners-revenue',
                 'transaction-fees', 'transaction-fees-usd',
                 'cost-per-transaction', 'cost-per-transaction-percent'
-            ],
-            'Actividad de Red': [
+            ),
+            'Actividad de Red': (
                 'n-unique-addresses', 'n-transactions', 'n-payments',
                 'transactions-per-second', 'output-volume', 'mempool-count',
                 'mempool-growth', 'mempool-size', 'mempool-state-by-fee-level',
                 'utxo-count', 'n-transactions-excluding-popular',
                 'estimated-transaction-volume', 'estimated-transaction-volume-usd'
-            ],
-            'Señales de Mercado': ['mvrv', 'nvt', 'nvts'],
-            'Suministro': ['total-bitcoins']
-        }
+            ),
+            'Señales de Mercado': ('mvrv', 'nvt', 'nvts'),
+            'Suministro': ('total-bitcoins',)
+        })
+
+    @functools.lru_cache(maxsize=1)
+    def obtener_todas_metricas(self) -> Tuple[str, ...]:
+        return tuple(g for graficos in self.obtener_categorias_graficos().values() for g in graficos)
+
+    @functools.lru_cache(maxsize=None)
+    def obtener_nombres_categoria(self, categoria: str) -> Tuple[str, ...]:
+        return tuple(self.nombres_descriptivos.get(g, g) for g in self.obtener_categorias_graficos()[categoria])
 
     def obtener_precio_mercado(self, **params) -> pd.DataFrame:
         return self.obtener_grafico('market-price', **params)
@@ -199,6 +345,19 @@ class BlockchainInfoAPI:
     def obtener_transacciones(self, **params) -> pd.DataFrame:
         return self.obtener_grafico('n-transactions', **params)
 
+@st.cache_data(ttl=DURACION_CACHE, show_spinner=False, max_entries=256)
+def _solicitud_cacheada(_api: BlockchainInfoAPI, endpoint: str, params: tuple) -> Dict[str, Any]:
+    return _api._obtener_datos(endpoint, params)
+
+@st.cache_data(ttl=DURACION_CACHE, show_spinner=False, max_entries=256)
+def _grafico_cacheado(_api: BlockchainInfoAPI, endpoint: str, params: tuple) -> pd.DataFrame:
+    datos = _api._obtener_datos(endpoint, params)
+
+    if not datos or 'values' not in datos or not datos['values']:
+        return pd.DataFrame()
+
+    return _api._procesar_datos_grafico(datos)
+
 st.set_page_config(
     page_title="Bitcoin Analytics Dashboard",
     page_icon="₿",
@@ -277,27 +436,67 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_resource
+# Al limpiar st.cache_resource se cierran el pool HTTP y la caché en disco
+@st.cache_resource(on_release=BlockchainInfoAPI.close)
 def init_api():
     return BlockchainInfoAPI()
 
 api = init_api()
 
-def crear_grafico_plotly(df, titulo, y_label="Valor"):
-    fig = go.Figure()
+def indices_lttb(x: np.ndarray, y: np.ndarray, n_out: int = 2000) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: conserva la forma visual de la serie con n_out puntos
+    n = len(y)
+    if n <= n_out or n_out < 3 or not np.issubdtype(y.dtype, np.number):
+        return np.arange(n)
     
-    for col in df.columns:
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
-            mode='lines',
-            name=col,
-            line=dict(width=2),
-            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>Valor: %{y:,.2f}<extra></extra>'
-        ))
-    
-    fig.update_layout(
+    xf = x.astype(np.float64)
+    yf = y.astype(np.float64)
+    # Los huecos se rellenan con la media para que no cuenten como picos
+    yf = np.where(np.isfinite(yf), yf, np.nanmean(yf))
+    bordes = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        sig_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        cx, cy = xf[fin:sig_fin].mean(), yf[fin:sig_fin].mean()
+        areas = np.abs((xf[a] - cx) * (yf[ini:fin] - yf[a]) - (xf[a] - xf[ini:fin]) * (cy - yf[a]))
+        a = ini + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+def reducir_serie(df: pd.DataFrame, n_out: int = 2000) -> pd.DataFrame:
+    # Solo series de una columna numérica sobre índice temporal
+    if len(df) <= n_out or df.shape[1] != 1 or not isinstance(df.index, pd.DatetimeIndex):
+        return df
+    
+    x = df.index.values.astype('datetime64[ns]').astype(np.int64)
+    return df.iloc[indices_lttb(x, df.iloc[:, 0].to_numpy(), n_out)]
+
+def _hash_dataframe(df: pd.DataFrame) -> tuple:
+    # Hash por contenido (índice incluido); solo se usa con frames numéricos
+    return (tuple(df.columns), pd.util.hash_pandas_object(df, index=True).values.tobytes())
+
+def _construir_figura_dict(df, titulo, y_label, area=False, altura=500):
+    df = reducir_serie(df)
+    # Constructor directo: px.line valida y reescribe cada traza varias veces.
+    # Mismo umbral que render_mode='auto' de plotly express para pasar a WebGL
+    Traza = go.Scattergl if len(df) > 1000 else go.Scatter
+    trazas = [Traza(
+        x=df.index,
+        y=df[col].to_numpy(),
+        mode='lines',
+        name=str(col),
+        line=dict(width=2),
+        fill='tozeroy' if area else None,
+        hovertemplate='<b>%{x|%Y-%m-%d}</b><br>Valor: %{y:,.2f}<extra></extra>'
+    ) for col in df.columns]
+    
+    fig = go.Figure(data=trazas, layout=dict(
         title=dict(text=titulo, font=dict(size=20, color='#e6e6e6')),
+        legend_title_text="",
         xaxis_title="Fecha",
         yaxis_title=y_label,
         template="plotly_dark",
@@ -307,10 +506,165 @@ def crear_grafico_plotly(df, titulo, y_label="Valor"):
         font=dict(color='#a8b2d1'),
         xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
         yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-        height=500
-    )
+        height=altura
+    ))
+    
+    return fig.to_dict()
+
+@st.cache_data(ttl=DURACION_CACHE, show_spinner=False, max_entries=64, hash_funcs={pd.DataFrame: _hash_dataframe})
+def _figura_plotly_dict(df, titulo, y_label, area, altura):
+    return _construir_figura_dict(df, titulo, y_label, area, altura)
+
+def crear_grafico_plotly(df, titulo, y_label="Valor", area=False, altura=500):
+    # Frames con columnas no numéricas (p. ej. mempool por nivel de comisión) no tienen
+    # un hash de contenido estable: se construyen sin caché
+    if all(pd.api.types.is_numeric_dtype(t) for t in df.dtypes):
+        return go.Figure(_figura_plotly_dict(df, titulo, y_label, area, altura))
+    return go.Figure(_construir_figura_dict(df, titulo, y_label, area, altura))
+
+def escribir_hoja_excel(writer: pd.ExcelWriter, nombre_hoja: str, df: pd.DataFrame):
+    # Series numéricas: columnas completas directo al libro, sin el ExcelFormatter celda a celda
+    if not isinstance(df.index, pd.DatetimeIndex) or not all(pd.api.types.is_numeric_dtype(t) for t in df.dtypes):
+        df.to_excel(writer, sheet_name=nombre_hoja)
+        return
+    
+    encabezado = [df.index.name or ''] + [str(c) for c in df.columns]
+    columnas = []
+    for col in df.columns:
+        valores = df[col].to_numpy(dtype='float64')
+        # Excel no admite NaN/inf: se dejan las celdas vacías como hace to_excel
+        columnas.append(np.where(np.isfinite(valores), valores, None).tolist())
     
-    return fig
+    if MOTOR_EXCEL == 'xlsxwriter':
+        hoja = writer.book.add_worksheet(nombre_hoja)
+        formato_fecha = writer.book.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        # Fechas como serial de Excel calculado en bloque (días desde 1899-12-30)
+        nanos = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        hoja.write_row(0, 0, encabezado)
+        hoja.write_column(1, 0, (nanos / 86_400e9 + 25569).tolist(), formato_fecha)
+        for j, valores in enumerate(columnas, start=1):
+            hoja.write_column(1, j, valores)
+    else:
+        hoja = writer.book.create_sheet(nombre_hoja)
+        hoja.append(encabezado)
+        for fila in zip(df.index.to_pydatetime(), *columnas):
+            hoja.append(fila)
+
+# Blobs de exportación cacheados; solo se invocan con métricas que ya devolvieron datos,
+# para no fijar en caché un fallo transitorio de la API
+@st.cache_data(ttl=600, show_spinner=False, max_entries=128)
+def _exportar_grafico(_api: BlockchainInfoAPI, metrica: str, timespan: str, formato: str) -> bytes:
+    df = _api.obtener_grafico(metrica, timespan=timespan)
+    
+    buffer = BytesIO()
+    if formato == "CSV":
+        df.to_csv(buffer, encoding='utf-8')
+    elif formato == "Parquet":
+        df.to_parquet(buffer, engine='pyarrow', compression='zstd')
+    else:
+        with pd.ExcelWriter(buffer, engine=MOTOR_EXCEL) as writer:
+            escribir_hoja_excel(writer, metrica[:31], df)
+    return buffer.getvalue()
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=128)
+def _exportar_excel_multiple(_api: BlockchainInfoAPI, metricas: tuple, timespan: str) -> Tuple[bytes, int]:
+    resultados = dict(_api.obtener_graficos_lote(metricas, timespan=timespan))
+    
+    buffer = BytesIO()
+    metricas_exportadas = 0
+    hojas_usadas = set()
+    with pd.ExcelWriter(buffer, engine=MOTOR_EXCEL) as writer:
+        for metrica in metricas:
+            base = re.sub(r'[\[\]:*?/\\]', '-', _api.nombres_descriptivos.get(metrica, metrica))[:31]
+            # Excel limita los nombres a 31 caracteres sin distinguir mayúsculas:
+            # los que coinciden al truncar reciben un sufijo " (n)"
+            nombre_hoja, n = base, 2
+            while nombre_hoja.lower() in hojas_usadas:
+                sufijo = f" ({n})"
+                nombre_hoja = base[:31 - len(sufijo)] + sufijo
+                n += 1
+            hojas_usadas.add(nombre_hoja.lower())
+            try:
+                escribir_hoja_excel(writer, nombre_hoja, resultados[metrica])
+                metricas_exportadas += 1
+            except Exception as e:
+                logger.error(f"Error al exportar {metrica}: {str(e)}")
+    return buffer.getvalue(), metricas_exportadas
+
+@st.cache_data(ttl=DURACION_CACHE, show_spinner=False, max_entries=64)
+def _figura_pools_dict(pools: tuple, tamanos: np.ndarray, periodo: str):
+    # Pools por debajo del 0,5% se agrupan en "Otros" para aligerar el gráfico
+    etiquetas = np.array(pools, dtype=object)
+    menores = tamanos < 0.005 * tamanos.sum()
+    if menores.sum() > 1:
+        etiquetas = np.append(etiquetas[~menores], 'Otros')
+        tamanos = np.append(tamanos[~menores], tamanos[menores].sum())
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=etiquetas,
+        values=tamanos,
+        hole=0.4,
+        marker=dict(colors=px.colors.qualitative.Set3)
+    )], layout=dict(
+        title=dict(text=f"Distribución de Pools ({periodo})", font=dict(size=20, color='#e6e6e6')),
+        template="plotly_dark",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#a8b2d1'),
+        height=600
+    ))
+    
+    return fig.to_dict()
+
+@st.fragment
+def vista_previa_grafico(grafico: str, timespan: str):
+    if st.button("Ver", key=f"ver_{grafico}"):
+        with st.spinner("Cargando..."):
+            try:
+                df = api.obtener_grafico(grafico, timespan=timespan)
+                if not df.empty:
+                    fig = crear_grafico_plotly(df, api.nombres_descriptivos.get(grafico, grafico))
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.warning("⚠️ No hay datos disponibles")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+
+@st.fragment
+def mostrar_pools():
+    st.markdown("#### ⛏️ Distribución de Pools")
+    
+    periodos_pools = {
+        "24 horas": "24hours",
+        "48 horas": "48hours",
+        "4 días": "4days",
+        "1 semana": "1weeks",
+        "1 mes": "1months"
+    }
+    
+    periodo = st.selectbox("Período", list(periodos_pools.keys()), index=2)
+    
+    if st.button("🔍 Cargar Pools", type="primary"):
+        with st.spinner("Obteniendo datos..."):
+            try:
+                df_pools = api.obtener_pools(timespan=periodos_pools[periodo])
+                
+                if not df_pools.empty:
+                    fig = go.Figure(_figura_pools_dict(tuple(df_pools.index), df_pools['relativeSize'].to_numpy(), periodo))
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    st.markdown("#### 📊 Tabla de Distribución")
+                    # Formato en el cliente: la columna sigue siendo numérica y ordenable
+                    st.dataframe(
+                        df_pools,
+                        column_config={"relativeSize": st.column_config.NumberColumn("Porcentaje", format="%.2f%%")},
+                        use_container_width=True
+                    )
+                else:
+                    st.warning("No hay datos disponibles")
+                    
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
 
 st.markdown('<h1 class="gradient-text">₿ Bitcoin Analytics Dashboard</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Análisis profesional de datos de blockchain en tiempo real</p>', unsafe_allow_html=True)
@@ -329,7 +683,7 @@ timespan_options = {
 }
 
 with st.sidebar:
-    st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/4/46/Bitcoin.svg/1200px-Bitcoin.svg.png", width=100)
+    st.image(os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "bitcoin.svg"), width=100)
     st.markdown("## 🎯 Navegación")
     
     seccion = st.radio(
@@ -346,8 +700,9 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # Catálogo compartido por todas las secciones del script
     categorias = api.obtener_categorias_graficos()
-    total_metricas = sum(len(graficos) for graficos in categorias.values())
+    total_metricas = len(api.obtener_todas_metricas())
     
     st.markdown(f"""
     <div class="info-box">
@@ -361,13 +716,23 @@ if seccion == "🏠 Inicio":
     
     col1, col2, col3, col4 = st.columns(4)
     
+    # Hasta 1 año la serie es diaria: la del gráfico sirve también para la tarjeta de precio
+    periodo_precio = timespan if timespan in {'1months', '3months', '6months', '1year'} else '30days'
+    precio_df = None
+    
     with st.spinner("Cargando datos..."):
         try:
-            precio_df = api.obtener_precio_mercado(timespan='30days')
-            if len(precio_df) > 0:
-                valor_col = 'y' if 'y' in precio_df.columns else precio_df.columns[0]
-                precio_actual = precio_df[valor_col].iloc[-1]
-                precio_anterior = precio_df[valor_col].iloc[-2] if len(precio_df) > 1 else precio_actual
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                precio_df, cap_df, volumen_df, tx_df = executor.map(
+                    lambda obtener, periodo: obtener(timespan=periodo),
+                    [api.obtener_precio_mercado, api.obtener_cap_mercado, api.obtener_volumen_comercio, api.obtener_transacciones],
+                    [periodo_precio, '30days', '30days', '30days']
+                )
+            
+            precios, _ = api.valores_serie(precio_df)
+            if precios is not None:
+                precio_actual = precios[-1]
+                precio_anterior = precios[-2] if precios.size > 1 else precio_actual
                 delta_precio = ((precio_actual - precio_anterior) / precio_anterior) * 100
                 with col1:
                     st.metric("💰 Precio Bitcoin", f"${precio_actual:,.2f}", f"{delta_precio:+.2f}%")
@@ -375,30 +740,27 @@ if seccion == "🏠 Inicio":
                 with col1:
                     st.metric("💰 Precio Bitcoin", "N/A")
             
-            cap_df = api.obtener_cap_mercado(timespan='30days')
-            if len(cap_df) > 0:
-                valor_col = 'y' if 'y' in cap_df.columns else cap_df.columns[0]
-                cap_actual = cap_df[valor_col].iloc[-1]
+            caps, _ = api.valores_serie(cap_df)
+            if caps is not None:
+                cap_actual = caps[-1]
                 with col2:
                     st.metric("📈 Cap. de Mercado", f"${cap_actual/1e9:.2f}B")
             else:
                 with col2:
                     st.metric("📈 Cap. de Mercado", "N/A")
             
-            volumen_df = api.obtener_volumen_comercio(timespan='30days')
-            if len(volumen_df) > 0:
-                valor_col = 'y' if 'y' in volumen_df.columns else volumen_df.columns[0]
-                volumen_actual = volumen_df[valor_col].iloc[-1]
+            volumenes, _ = api.valores_serie(volumen_df)
+            if volumenes is not None:
+                volumen_actual = volumenes[-1]
                 with col3:
                     st.metric("💹 Volumen 24h", f"${volumen_actual/1e6:.2f}M")
             else:
                 with col3:
                     st.metric("💹 Volumen 24h", "N/A")
             
-            tx_df = api.obtener_transacciones(timespan='30days')
-            if len(tx_df) > 0:
-                valor_col = 'y' if 'y' in tx_df.columns else tx_df.columns[0]
-                tx_actual = tx_df[valor_col].iloc[-1]
+            txs, _ = api.valores_serie(tx_df)
+            if txs is not None:
+                tx_actual = txs[-1]
                 with col4:
                     st.metric("🔄 Transacciones 24h", f"{tx_actual:,.0f}")
             else:
@@ -415,7 +777,8 @@ if seccion == "🏠 Inicio":
     with col1:
         st.markdown("### 📈 Evolución del Precio")
         try:
-            precio_df = api.obtener_precio_mercado(timespan=timespan)
+            if precio_df is None or periodo_precio != timespan:
+                precio_df = api.obtener_precio_mercado(timespan=timespan)
             if not precio_df.empty:
                 fig = crear_grafico_plotly(precio_df, "Precio de Bitcoin (USD)", "Precio (USD)")
                 st.plotly_chart(fig, use_container_width=True)
@@ -452,15 +815,12 @@ elif seccion == "📊 Visualización":
     col1, col2 = st.columns([1, 2])
     
     with col1:
-        categorias = api.obtener_categorias_graficos()
         categoria_seleccionada = st.selectbox("🏷️ Categoría", list(categorias.keys()))
         
-        graficos_categoria = categorias[categoria_seleccionada]
-        nombres_mostrar = [api.nombres_descriptivos.get(g, g) for g in graficos_categoria]
+        nombres_mostrar = api.obtener_nombres_categoria(categoria_seleccionada)
         metrica_mostrar = st.selectbox("📈 Métrica", nombres_mostrar)
         
-        indice = nombres_mostrar.index(metrica_mostrar)
-        metrica_seleccionada = graficos_categoria[indice]
+        metrica_seleccionada = api.ids_por_descripcion.get(metrica_mostrar, metrica_mostrar)
         
         tipo_grafico = st.selectbox("📊 Tipo de gráfico", ["Línea", "Área"])
     
@@ -476,42 +836,22 @@ elif seccion == "📊 Visualización":
                     st.error("❌ No hay datos disponibles")
                     st.info("💡 Intenta con otro período o métrica")
                 else:
-                    fig = go.Figure()
-                    
-                    if tipo_grafico == "Línea":
-                        for col in df.columns:
-                            fig.add_trace(go.Scatter(x=df.index, y=df[col], mode='lines', name=col, line=dict(width=2)))
-                    else:
-                        for col in df.columns:
-                            fig.add_trace(go.Scatter(x=df.index, y=df[col], fill='tozeroy', name=col))
-                    
-                    fig.update_layout(
-                        title=dict(text=metrica_mostrar, font=dict(size=20, color='#e6e6e6')),
-                        xaxis_title="Fecha",
-                        yaxis_title="Valor",
-                        template="plotly_dark",
-                        hovermode='x unified',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(color='#a8b2d1'),
-                        height=600
-                    )
-                    
+                    fig = crear_grafico_plotly(df, metrica_mostrar, area=tipo_grafico == "Área", altura=600)
                     st.plotly_chart(fig, use_container_width=True)
                     
                     st.markdown("### 📊 Estadísticas")
                     col1, col2, col3, col4 = st.columns(4)
                     
-                    valor_col = 'y' if 'y' in df.columns else df.columns[0]
+                    valores, _ = api.valores_serie(df)
                     
                     with col1:
-                        st.metric("Máximo", f"{df[valor_col].max():,.2f}")
+                        st.metric("Máximo", f"{np.nanmax(valores):,.2f}")
                     with col2:
-                        st.metric("Mínimo", f"{df[valor_col].min():,.2f}")
+                        st.metric("Mínimo", f"{np.nanmin(valores):,.2f}")
                     with col3:
-                        st.metric("Promedio", f"{df[valor_col].mean():,.2f}")
+                        st.metric("Promedio", f"{np.nanmean(valores):,.2f}")
                     with col4:
-                        st.metric("Último Valor", f"{df[valor_col].iloc[-1]:,.2f}")
+                        st.metric("Último Valor", f"{valores[-1]:,.2f}")
                     
                     with st.expander("📋 Ver datos en tabla"):
                         st.dataframe(df.tail(50), use_container_width=True)
@@ -549,8 +889,6 @@ elif seccion == "📈 Comparación":
     
     st.markdown("---")
     
-    categorias = api.obtener_categorias_graficos()
-    
     col1, col2 = st.columns([1, 1])
     
     with col1:
@@ -561,34 +899,19 @@ elif seccion == "📈 Comparación":
             st.session_state.metricas_comparacion = []
             st.rerun()
         
-        # Si hay métricas en session state, mostrarlas
-        if st.session_state.metricas_comparacion:
-            st.success(f"✅ {len(st.session_state.metricas_comparacion)} métricas seleccionadas")
-            for m in st.session_state.metricas_comparacion:
-                st.write(f"• {api.nombres_descriptivos.get(m, m)}")
-        
-        # Función callback para manejar cambios en checkboxes
-        def toggle_metrica(metrica):
-            if metrica in st.session_state.metricas_comparacion:
-                st.session_state.metricas_comparacion.remove(metrica)
-            else:
-                st.session_state.metricas_comparacion.append(metrica)
+        # Un único multiselect; su estado se copia a metricas_comparacion para que
+        # la selección sobreviva al cambiar de sección
+        def sincronizar_seleccion():
+            st.session_state.metricas_comparacion = st.session_state.multiselect_comparacion
         
-        # Selección manual con checkboxes
-        for categoria, graficos in categorias.items():
-            with st.expander(f"📁 {categoria} ({len(graficos)})"):
-                for grafico in graficos:
-                    nombre_desc = api.nombres_descriptivos.get(grafico, grafico)
-                    # Verificar si está en session state
-                    is_checked = grafico in st.session_state.metricas_comparacion
-                    
-                    st.checkbox(
-                        nombre_desc, 
-                        value=is_checked, 
-                        key=f"check_{grafico}",
-                        on_change=toggle_metrica,
-                        args=(grafico,)
-                    )
+        st.session_state.multiselect_comparacion = st.session_state.metricas_comparacion
+        st.multiselect(
+            "Métricas",
+            api.obtener_todas_metricas(),
+            format_func=lambda g: api.nombres_descriptivos.get(g, g),
+            key="multiselect_comparacion",
+            on_change=sincronizar_seleccion
+        )
     
     with col2:
         st.markdown("#### ⚙️ Opciones de Comparación")
@@ -611,41 +934,57 @@ elif seccion == "📈 Comparación":
         metricas_seleccionadas = st.session_state.metricas_comparacion
         
         with st.spinner("Generando comparación..."):
-            fig = go.Figure()
+            trazas = []
             metricas_exitosas = []
             metricas_fallidas = []
             
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            for idx, metrica in enumerate(metricas_seleccionadas):
+            resultados = {}
+            for idx, (metrica, df) in enumerate(api.obtener_graficos_lote(metricas_seleccionadas, timespan=timespan)):
+                status_text.text(f"Cargando {idx+1}/{len(metricas_seleccionadas)}: {api.nombres_descriptivos.get(metrica, metrica)}")
+                resultados[metrica] = df
+                progress_bar.progress((idx + 1) / len(metricas_seleccionadas))
+            
+            # WebGL cuando el total de puntos superpuestos es alto; un solo tipo de traza
+            # por figura para que 'tonexty' funcione
+            Traza = go.Scattergl if sum(len(df) for df in resultados.values()) > 2000 else go.Scatter
+            
+            # Construir las trazas en el orden de selección
+            for metrica in metricas_seleccionadas:
+                nombre_desc = api.nombres_descriptivos.get(metrica, metrica)
                 try:
-                    status_text.text(f"Cargando {idx+1}/{len(metricas_seleccionadas)}: {api.nombres_descriptivos.get(metrica, metrica)}")
-                    
-                    df = api.obtener_grafico(metrica, timespan=timespan)
+                    df = resultados[metrica]
+                    valores, _ = api.valores_serie(df)
                     
-                    if df.empty:
-                        metricas_fallidas.append((api.nombres_descriptivos.get(metrica, metrica), "Sin datos"))
+                    if valores is None:
+                        metricas_fallidas.append((nombre_desc, "Sin datos"))
                         continue
                     
+                    # Epoch en ms: Plotly serializa enteros mucho más rápido que datetime64
+                    fechas = df.index.values.astype('datetime64[ms]').astype(np.int64)
                     if normalizar:
-                        df = (df / df.iloc[0]) * 100
+                        # Base: primer valor finito y distinto de cero (series que arrancan en 0 o con huecos)
+                        validos = valores[np.isfinite(valores) & (valores != 0)]
+                        if validos.size:
+                            valores = valores * (100.0 / validos[0])
                     
-                    nombre_desc = api.nombres_descriptivos.get(metrica, metrica)
-                    valor_col = 'y' if 'y' in df.columns else df.columns[0]
+                    muestra = indices_lttb(fechas, valores)
+                    fechas, valores = fechas[muestra], valores[muestra]
                     
                     if tipo_grafico == "Línea":
-                        fig.add_trace(go.Scatter(
-                            x=df.index,
-                            y=df[valor_col],
+                        trazas.append(Traza(
+                            x=fechas,
+                            y=valores,
                             mode='lines',
                             name=nombre_desc,
                             line=dict(width=2)
                         ))
                     else:  # Área
-                        fig.add_trace(go.Scatter(
-                            x=df.index,
-                            y=df[valor_col],
+                        trazas.append(Traza(
+                            x=fechas,
+                            y=valores,
                             fill='tonexty',
                             name=nombre_desc,
                             mode='lines',
@@ -656,18 +995,17 @@ elif seccion == "📈 Comparación":
                     
                 except Exception as e:
                     error_msg = str(e)
-                    metricas_fallidas.append((api.nombres_descriptivos.get(metrica, metrica), error_msg))
+                    metricas_fallidas.append((nombre_desc, error_msg))
                     logger.error(f"Error en comparación con {metrica}: {error_msg}")
-                finally:
-                    progress_bar.progress((idx + 1) / len(metricas_seleccionadas))
             
             progress_bar.empty()
             status_text.empty()
             
             if metricas_exitosas:
-                fig.update_layout(
+                # Trazas y layout en el constructor: una sola validación de la figura
+                fig = go.Figure(data=trazas, layout=dict(
                     title=dict(text="Comparación de Métricas de Bitcoin", font=dict(size=20, color='#e6e6e6')),
-                    xaxis_title="Fecha",
+                    xaxis=dict(title="Fecha", type='date'),
                     yaxis_title="Valor normalizado (%)" if normalizar else "Valor",
                     template="plotly_dark",
                     hovermode='x unified',
@@ -680,7 +1018,7 @@ elif seccion == "📈 Comparación":
                         bordercolor='rgba(255,255,255,0.2)',
                         borderwidth=1
                     )
-                )
+                ))
                 
                 st.plotly_chart(fig, use_container_width=True)
                 
@@ -715,8 +1053,6 @@ elif seccion == "🔍 Explorador":
     with tab1:
         st.markdown("#### 📋 Catálogo Completo")
         
-        categorias = api.obtener_categorias_graficos()
-        
         for categoria, graficos in categorias.items():
             with st.expander(f"📁 {categoria} ({len(graficos)} métricas)"):
                 for grafico in graficos:
@@ -725,83 +1061,35 @@ elif seccion == "🔍 Explorador":
                         st.write(f"**{api.nombres_descriptivos.get(grafico, grafico)}**")
                         st.caption(f"ID: `{grafico}`")
                     with col2:
-                        if st.button("Ver", key=f"ver_{grafico}"):
-                            with st.spinner("Cargando..."):
-                                try:
-                                    df = api.obtener_grafico(grafico, timespan=timespan)
-                                    if not df.empty:
-                                        fig = crear_grafico_plotly(df, api.nombres_descriptivos.get(grafico, grafico))
-                                        st.plotly_chart(fig, use_container_width=True)
-                                    else:
-                                        st.warning("⚠️ No hay datos disponibles")
-                                except Exception as e:
-                                    st.error(f"Error: {str(e)}")
+                        # Fragmento: "Ver" solo re-ejecuta esta vista previa, no el catálogo
+                        vista_previa_grafico(grafico, timespan)
     
     with tab2:
-        st.markdown("#### ⛏️ Distribución de Pools")
-        
-        periodos_pools = {
-            "24 horas": "24hours",
-            "48 horas": "48hours",
-            "4 días": "4days",
-            "1 semana": "1weeks",
-            "1 mes": "1months"
-        }
-        
-        periodo = st.selectbox("Período", list(periodos_pools.keys()), index=2)
-        
-        if st.button("🔍 Cargar Pools", type="primary"):
-            with st.spinner("Obteniendo datos..."):
-                try:
-                    df_pools = api.obtener_pools(timespan=periodos_pools[periodo])
-                    
-                    if not df_pools.empty:
-                        fig = go.Figure(data=[go.Pie(
-                            labels=df_pools.index,
-                            values=df_pools['relativeSize'],
-                            hole=0.4,
-                            marker=dict(colors=px.colors.qualitative.Set3)
-                        )])
-                        
-                        fig.update_layout(
-                            title=dict(text=f"Distribución de Pools ({periodo})", font=dict(size=20, color='#e6e6e6')),
-                            template="plotly_dark",
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            paper_bgcolor='rgba(0,0,0,0)',
-                            font=dict(color='#a8b2d1'),
-                            height=600
-                        )
-                        
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        st.markdown("#### 📊 Tabla de Distribución")
-                        df_pools['Porcentaje'] = df_pools['relativeSize'].apply(lambda x: f"{x:.2f}%")
-                        st.dataframe(df_pools[['Porcentaje']], use_container_width=True)
-                    else:
-                        st.warning("No hay datos disponibles")
-                        
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+        # Fragmento: el selector de período y la carga solo re-ejecutan esta pestaña
+        mostrar_pools()
 
 elif seccion == "📥 Exportar Datos":
     st.markdown("### 📥 Exportar Datos")
     
+    fecha_archivo = datetime.now().strftime('%Y%m%d')
+    
     col1, col2 = st.columns([1, 1])
     
     with col1:
         st.markdown("#### Exportación Simple")
         
-        categorias = api.obtener_categorias_graficos()
         categoria = st.selectbox("Categoría", list(categorias.keys()), key="export_cat")
-        graficos_cat = categorias[categoria]
-        nombres_desc = [api.nombres_descriptivos.get(g, g) for g in graficos_cat]
-        metrica_desc = st.selectbox("Métrica", nombres_desc, key="export_metric")
-        indice = nombres_desc.index(metrica_desc)
-        metrica = graficos_cat[indice]
+        nombres_desc = api.obtener_nombres_categoria(categoria)
+        
+        # La categoría queda fuera del formulario porque determina las opciones de métrica
+        with st.form("export_simple"):
+            metrica_desc = st.selectbox("Métrica", nombres_desc, key="export_metric")
+            formato = st.radio("Formato", ["CSV", "Excel", "Parquet"])
+            exportar = st.form_submit_button("📥 Exportar", type="primary")
         
-        formato = st.radio("Formato", ["CSV", "Excel"])
+        metrica = api.ids_por_descripcion.get(metrica_desc, metrica_desc)
         
-        if st.button("📥 Exportar", type="primary"):
+        if exportar:
             with st.spinner("Exportando..."):
                 try:
                     df = api.obtener_grafico(metrica, timespan=timespan)
@@ -809,23 +1097,26 @@ elif seccion == "📥 Exportar Datos":
                     if df.empty:
                         st.error("❌ No hay datos disponibles")
                     else:
+                        datos = _exportar_grafico(api, metrica, timespan, formato)
                         if formato == "CSV":
-                            csv = df.to_csv().encode('utf-8')
                             st.download_button(
                                 label="⬇️ Descargar CSV",
-                                data=csv,
-                                file_name=f"{metrica}_{datetime.now().strftime('%Y%m%d')}.csv",
+                                data=datos,
+                                file_name=f"{metrica}_{fecha_archivo}.csv",
                                 mime="text/csv"
                             )
+                        elif formato == "Parquet":
+                            st.download_button(
+                                label="⬇️ Descargar Parquet",
+                                data=datos,
+                                file_name=f"{metrica}_{fecha_archivo}.parquet",
+                                mime="application/vnd.apache.parquet"
+                            )
                         else:
-                            buffer = BytesIO()
-                            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                                df.to_excel(writer, sheet_name=metrica[:31])
-                            
                             st.download_button(
                                 label="⬇️ Descargar Excel",
-                                data=buffer.getvalue(),
-                                file_name=f"{metrica}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                                data=datos,
+                                file_name=f"{metrica}_{fecha_archivo}.xlsx",
                                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                             )
                         
@@ -838,39 +1129,34 @@ elif seccion == "📥 Exportar Datos":
         st.markdown("#### Exportación Múltiple")
         st.info("Selecciona múltiples métricas para exportar en Excel")
         
-        metricas_export = []
-        for cat, graficos in categorias.items():
-            with st.expander(f"📁 {cat}"):
-                for grafico in graficos:
-                    nombre = api.nombres_descriptivos.get(grafico, grafico)
-                    if st.checkbox(nombre, key=f"export_multi_{grafico}"):
-                        metricas_export.append(grafico)
+        with st.form("export_multiple"):
+            metricas_export = st.multiselect(
+                "Métricas",
+                api.obtener_todas_metricas(),
+                format_func=lambda g: api.nombres_descriptivos.get(g, g),
+                key="export_multi"
+            )
+            exportar_multiples = st.form_submit_button("📥 Exportar Múltiples", type="primary")
         
-        if metricas_export:
-            st.success(f"✅ {len(metricas_export)} métricas seleccionadas")
-            
-            if st.button("📥 Exportar Múltiples", type="primary"):
+        if exportar_multiples:
+            if not metricas_export:
+                st.warning("Selecciona al menos una métrica")
+            else:
+                st.success(f"✅ {len(metricas_export)} métricas seleccionadas")
+                
                 with st.spinner("Generando Excel..."):
                     try:
-                        buffer = BytesIO()
-                        metricas_exportadas = 0
+                        # Descarga concurrente; obtener_grafico devuelve un DataFrame vacío si falla
+                        resultados = dict(api.obtener_graficos_lote(metricas_export, timespan=timespan))
+                        exportables = tuple(m for m in metricas_export if not resultados[m].empty)
                         
-                        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                            for metrica in metricas_export:
-                                try:
-                                    df = api.obtener_grafico(metrica, timespan=timespan)
-                                    if not df.empty:
-                                        nombre_hoja = api.nombres_descriptivos.get(metrica, metrica)[:31]
-                                        df.to_excel(writer, sheet_name=nombre_hoja)
-                                        metricas_exportadas += 1
-                                except:
-                                    continue
+                        datos, metricas_exportadas = _exportar_excel_multiple(api, exportables, timespan) if exportables else (b'', 0)
                         
                         if metricas_exportadas > 0:
                             st.download_button(
                                 label="⬇️ Descargar Excel Completo",
-                                data=buffer.getvalue(),
-                                file_name=f"bitcoin_metrics_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                                data=datos,
+                                file_name=f"bitcoin_metrics_{fecha_archivo}.xlsx",
                                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                             )
                             